@@ -348,10 +348,10 @@ void render_toc(int cursor, int scroll)
 
         char line[TEXT_COLS + 1];
         if (selected) {
-            snprintf(line, sizeof(line), " > %-73s", wiki_pages[page_idx].title);
+            snprintf(line, sizeof(line), " > %-73s", wiki_page_title(page_idx));
             render_text_inv(0, row, line, COL_CURSOR_FG, COL_HIGHLIGHT);
         } else {
-            snprintf(line, sizeof(line), "   %s", wiki_pages[page_idx].title);
+            snprintf(line, sizeof(line), "   %s", wiki_page_title(page_idx));
             render_text(0, row, line, COL_FG);
         }
     }
@@ -376,10 +376,11 @@ void render_page(int page_idx, int scroll)
 
     const wiki_page_t *page = &wiki_pages[page_idx];
 
-    /* Header: title + page index */
-    char header[TEXT_COLS + 1];
-    snprintf(header, sizeof(header), "<< %-60s [%d/%d]",
-             page->title, page_idx + 1, WIKI_PAGE_COUNT);
+    /* Header: title + page index (title cut to 60 so the index always
+     * shows; render_text clips the line to TEXT_COLS) */
+    char header[TEXT_COLS + 24];
+    snprintf(header, sizeof(header), "<< %-60.60s [%d/%d]",
+             wiki_page_title(page_idx), page_idx + 1, WIKI_PAGE_COUNT);
     render_text(0, HEADER_ROW, header, COL_TITLE);
     render_hline(1, '=', COL_DIM);
 
@@ -391,10 +392,11 @@ void render_page(int page_idx, int scroll)
         int line_idx = scroll + i;
         if (line_idx >= page->line_count) break;
 
-        const wiki_line_t *line = &page->lines[line_idx];
+        const char *text = wiki_line_text(page_idx, line_idx);
+        int type = wiki_line_type(page_idx, line_idx);
         uint32_t color;
 
-        switch (line->type) {
+        switch (type) {
         case LINE_H2:
             color = COL_H2;
             break;
@@ -406,18 +408,18 @@ void render_page(int page_idx, int scroll)
             break;
         }
 
-        if (line->type == LINE_H2) {
+        if (type == LINE_H2) {
             /* H2: yellow with == markers */
             char buf[TEXT_COLS + 1];
-            snprintf(buf, sizeof(buf), "== %s ==", line->text);
+            snprintf(buf, sizeof(buf), "== %s ==", text);
             render_text(0, CONTENT_START + i, buf, color);
-        } else if (line->type == LINE_H3) {
+        } else if (type == LINE_H3) {
             /* H3: bright with --- markers */
             char buf[TEXT_COLS + 1];
-            snprintf(buf, sizeof(buf), "--- %s ---", line->text);
+            snprintf(buf, sizeof(buf), "--- %s ---", text);
             render_text(0, CONTENT_START + i, buf, color);
         } else {
-            render_text(1, CONTENT_START + i, line->text, color);
+            render_text(1, CONTENT_START + i, text, color);
         }
     }
 
@@ -0,0 +1,318 @@
+"""Tests for tools/fetch_wiki.py's wikitext conversion."""
+
+import http.server
+import os
+import random
+import re
+import socket
+import sys
+import threading
+import urllib.error
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tools"))
+
+import fetch_wiki  # noqa: E402
+
+
+# ── strip_inline_markup vs. the old multi-pass path ────────────
+
+# The sequential regex passes strip_inline_markup used before they were
+# fused into INLINE_TOKEN_RE, kept as a correctness oracle. Templates,
+# entities and whitespace are handled the same way on both sides.
+OLD_PASSES = [
+    (re.compile(r"<br\s*/?>", re.IGNORECASE), " / "),
+    (re.compile(r"</?[a-zA-Z][^>]*>"), ""),
+    (re.compile(r"'{2,3}"), ""),
+    (re.compile(r"\[\[#[^|\]]*\|Link\]\]"), ""),
+    (re.compile(r"\[\[#[^|\]]*\|\s*\*\s*\]\]"), ""),
+    (re.compile(r"\[\[#[^|\]]*\|([^\]]+)\]\]"), r"\1"),
+    (re.compile(r"\[\[[^|\]]*\|([^\]]+)\]\]"), r"\1"),
+    (re.compile(r"\[\[([^\]]+)\]\]"), r"\1"),
+    (re.compile(r"\]\]"), ""),
+    (re.compile(r"\[https?://[^\s\]]+ ([^\]]+)\]"), r"\1"),
+    (re.compile(r"\[https?://[^\]]+\]"), ""),
+    (re.compile(r"https?://\S+"), ""),
+]
+
+
+def old_strip_inline_markup(text):
+    text = fetch_wiki.strip_templates(text)
+    for pattern, repl in OLD_PASSES:
+        text = pattern.sub(repl, text)
+    if "&" in text:
+        text = fetch_wiki.normalize_unicode(fetch_wiki.html.unescape(text))
+    return fetch_wiki.MULTI_SPACE_RE.sub(" ", text).strip()
+
+
+INLINE_PIECES = [
+    "word", "Two words", "'''bold'''", "''italic''", "'''''both'''''",
+    "[[Page]]", "[[Page|Shown text]]", "[[#anchor|Link]]", "[[#anchor| * ]]",
+    "[[#anchor|Anchor text]]", "[[Page|'''bold link''']]",
+    "<br>", "<br />", "<BR/>", '<span class="x">', "</span>", "<center>",
+    "[http://example.com/x Label]", "[https://example.com/y]",
+    "http://bare.example/path", "{{Template|arg}}",
+    "&amp;", "&lt;", "&gt;", "&quot;", "&#42;",
+]
+
+
+def test_strip_inline_markup_matches_old_passes():
+    rng = random.Random(7)
+    for _ in range(5000):
+        # Space-separated, so no token can run into its neighbour
+        line = " ".join(rng.choice(INLINE_PIECES) for _ in range(rng.randint(0, 8)))
+        assert fetch_wiki.strip_inline_markup(line) == old_strip_inline_markup(line), line
+
+
+def test_strip_inline_markup_known_differences():
+    # Differences from the old passes, where tokens touch each other
+    # Bare URLs stop at "<", so text after a tag survives
+    assert fetch_wiki.strip_inline_markup("http://x.com/a<span>y") == "y"
+    # A URL glued to a link swallows the link's first half
+    assert fetch_wiki.strip_inline_markup("http://x.com/a[[#a| * ]]") == "*"
+    # '' runs split by a tag are removed separately, not glued into ''''
+    assert fetch_wiki.strip_inline_markup("''<span>''x") == "x"
+
+
+# ── Templates ──────────────────────────────────────────────────
+
+def test_strip_templates_nested():
+    assert fetch_wiki.strip_templates("a {{b {{c {{d {{e}} }} }} }} f") == "a  f"
+
+
+def test_strip_templates_keeps_unclosed_braces():
+    assert fetch_wiki.strip_templates("x {{a}} {{b {{c}} y") == "x  {{b  y"
+    assert fetch_wiki.strip_templates("a }} b {{c}}") == "a }} b "
+
+
+def test_strip_templates_many_unclosed_openers():
+    text = "{{ x " * 5000
+    assert fetch_wiki.strip_templates(text) == text
+
+
+# ── Tables ─────────────────────────────────────────────────────
+
+def test_table_cell_pipe_inside_tag_is_not_a_separator():
+    table = "\n".join([
+        "{|",
+        "! Name",
+        '! <span title="a|b">Info</span>',
+        "|-",
+        '| <span title="a|b">t</span> || style="x" | [[Page|shown]]',
+        "|}",
+    ])
+    assert fetch_wiki.parse_wiki_table(table) == ["  t:", "    Info: shown", ""]
+
+
+def test_table_cell_attributes_are_dropped():
+    assert fetch_wiki.clean_table_cell(' style="x" | [[Page|shown]]') == "shown"
+    assert fetch_wiki.clean_table_cell(" class=wide | text") == "text"
+    # Without an = or class, the prefix is content
+    assert fetch_wiki.clean_table_cell(" a | b") == "a | b"
+    assert fetch_wiki.clean_table_cell(" a | b", header=True) == "b"
+
+
+# ── Parse cache ────────────────────────────────────────────────
+
+PAGE = "== Controls ==\n* Press [[Start|start]] &amp; go\n" + "word " * 40
+
+
+def test_parse_cache_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch_wiki, "PARSE_CACHE_DIR", str(tmp_path))
+    expected = fetch_wiki.wiki_to_plain(PAGE)
+    assert fetch_wiki.cached_wiki_to_plain(PAGE) == expected
+    source_dir = tmp_path / fetch_wiki.SOURCE_DIGEST.hex()
+    assert [p.suffix for p in source_dir.iterdir()] == [".json"]
+    assert fetch_wiki.cached_wiki_to_plain(PAGE) == expected
+
+
+def test_parse_cache_key_includes_source(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch_wiki, "PARSE_CACHE_DIR", str(tmp_path))
+    fetch_wiki.cached_wiki_to_plain(PAGE)
+    (tmp_path / "stale.json").write_text("[]")
+    monkeypatch.setattr(fetch_wiki, "SOURCE_DIGEST", b"edited converter")
+    fetch_wiki.cached_wiki_to_plain(PAGE)
+    # The edited script misses the old entries and deletes them
+    assert [p.name for p in tmp_path.iterdir()] == [b"edited converter".hex()]
+
+
+def test_parse_cache_write_failure_is_not_fatal(tmp_path, monkeypatch):
+    # A file where the cache directory should be makes every write fail
+    blocker = tmp_path / "plain"
+    blocker.write_text("")
+    monkeypatch.setattr(fetch_wiki, "PARSE_CACHE_DIR", str(blocker))
+    assert fetch_wiki.cached_wiki_to_plain(PAGE) == fetch_wiki.wiki_to_plain(PAGE)
+
+
+# ── HTTP connection pool ───────────────────────────────────────
+
+@pytest.fixture
+def fresh_http(monkeypatch):
+    """Give each test its own connection pool and bypass any proxy."""
+    for var in ("http_proxy", "HTTP_PROXY", "https_proxy", "HTTPS_PROXY"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setattr(fetch_wiki, "_http_local", threading.local())
+    yield
+    fetch_wiki.close_http_connections()
+
+
+def serve_in_background(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class KeepAliveHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = []
+
+    def setup(self):
+        super().setup()
+        self.connections.append(self.client_address)
+
+    def do_GET(self):
+        if self.path == "/missing":
+            self.send_error(404)
+            return
+        body = self.path.encode("ascii")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class DroppingServer:
+    """Answers each connection's first request (or none), then hangs up."""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.requests = []
+        self.closed = threading.Event()
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        threading.Thread(target=self.serve, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.sock.getsockname()[1]}"
+
+    def serve(self):
+        while True:
+            conn, _addr = self.sock.accept()
+            with conn:
+                request = b""
+                while b"\r\n\r\n" not in request:
+                    request += conn.recv(65536)
+                self.requests.append(request.split(b" ")[1])
+                if self.respond:
+                    conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+            self.closed.set()
+
+
+def test_http_request_reuses_connection(fresh_http):
+    KeepAliveHandler.connections = []
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    base = serve_in_background(server)
+    try:
+        assert fetch_wiki.http_request(base + "/a")[2] == b"/a"
+        assert fetch_wiki.http_request(base + "/b?x=1")[2] == b"/b?x=1"
+        assert len(KeepAliveHandler.connections) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_http_request_raises_http_error(fresh_http):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    base = serve_in_background(server)
+    try:
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            fetch_wiki.http_request(base + "/missing")
+        assert excinfo.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_http_request_resends_once_after_idle_drop(fresh_http):
+    server = DroppingServer(respond=True)
+    assert fetch_wiki.http_request(server.url + "/a")[2] == b"ok"
+    # The server has hung up on the kept-alive connection
+    assert server.closed.wait(5)
+    assert fetch_wiki.http_request(server.url + "/b")[2] == b"ok"
+    assert server.requests == [b"/a", b"/b"]
+
+
+def test_http_request_does_not_resend_on_fresh_connection(fresh_http):
+    server = DroppingServer(respond=False)
+    with pytest.raises(ConnectionResetError):
+        fetch_wiki.http_request(server.url + "/a")
+    assert server.closed.wait(5)
+    assert server.requests == [b"/a"]
+
+
+# ── Export cache ───────────────────────────────────────────────
+
+def test_export_cache_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch_wiki, "CACHE_DIR", str(tmp_path))
+    fetch_wiki.store_cached_page("A/B", 12, "A/B", PAGE)
+    assert fetch_wiki.load_cached_page("A/B", 12) == ("A/B", PAGE)
+    assert fetch_wiki.load_cached_page("A/B", 13) is None
+    assert [p.suffix for p in tmp_path.iterdir()] == [".json"]
+
+
+def test_export_cache_write_failure_is_not_fatal(tmp_path, monkeypatch):
+    blocker = tmp_path / "cache"
+    blocker.write_text("")
+    monkeypatch.setattr(fetch_wiki, "CACHE_DIR", str(blocker))
+    fetch_wiki.store_cached_page("A", 12, "A", PAGE)
+    assert fetch_wiki.load_cached_page("A", 12) is None
+
+
+# ── C header ───────────────────────────────────────────────────
+
+C_ESCAPES = {"\\": "\\", '"': '"', "t": "\t", "n": "\n", "0": "\0"}
+
+
+def c_array(header, name):
+    body = re.search(name + r"\[[^\]]*\] = \{\n(.*?)\};", header, re.DOTALL).group(1)
+    return [int(value, 0) for value in body.replace(",", " ").split()]
+
+
+def test_write_header_offsets_point_at_their_strings():
+    lines = [
+        ("back\\slash", fetch_wiki.LINE_H2),
+        ('say "hi"', fetch_wiki.LINE_NORMAL),
+        ("a\ttab", fetch_wiki.LINE_H3),
+        ("two\nlines", fetch_wiki.LINE_H4),
+        ("", fetch_wiki.LINE_BLANK),
+        ('say "hi"', fetch_wiki.LINE_NORMAL),
+    ]
+    pages = [("Page \"One\"", lines), ("Two", lines[2:])]
+    fp = fetch_wiki.io.StringIO()
+    fetch_wiki.write_header(pages, fp)
+    header = fp.getvalue()
+
+    literals = re.search(r"wiki_text\[\] =\n(.*?)\n    ;", header, re.DOTALL).group(1)
+    blob = "".join(
+        re.sub(r"\\(.)", lambda m: C_ESCAPES[m.group(1)], literal)
+        for literal in re.findall(r'^    "(.*)"$', literals, re.MULTILINE)
+    )
+
+    def string_at(offset):
+        return blob[offset:blob.index("\0", offset)]
+
+    all_lines = lines + lines[2:]
+    offsets = c_array(header, "wiki_line_offsets")
+    assert [string_at(off) for off in offsets] == [text for text, _type in all_lines]
+    # Repeated strings are stored once
+    assert offsets[1] == offsets[5]
+
+    packed = c_array(header, "wiki_line_types")
+    types = [(packed[n >> 2] >> ((n & 3) * 2)) & 3 for n in range(len(all_lines))]
+    assert types == [line_type for _text, line_type in all_lines]
+
+    page_rows = re.findall(r"\{(\d+), (\d+), (\d+)\},", header)
+    assert [(string_at(int(t)), int(first), int(count)) for t, first, count in page_rows] == [
+        ('Page "One"', 0, 6),
+        ("Two", 6, 4),
+    ]
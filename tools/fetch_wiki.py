@@ -11,22 +11,48 @@ Usage:
     python3 tools/fetch_wiki.py
 """
 
+import base64
+import functools
+import hashlib
+import html
+import http.client
+import io
 import json
+import os
 import re
+import shutil
 import sys
+import threading
 import time
+import unicodedata
+import urllib.error
+import urllib.parse
 import urllib.request
-import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timezone
 
+try:
+    from lxml import etree  # libxml2-backed, much faster when available
+except ImportError:
+    import xml.etree.ElementTree as etree
+
 # ── Configuration ──────────────────────────────────────────────
 
 WIKI_BASE = "https://www.emuvr.net/wiki"
 API_URL = "https://www.emuvr.net/w/api.php"
 EXPORT_URL = f"{WIKI_BASE}/Special:Export"
 MW_NS = "http://www.mediawiki.org/xml/export-0.10/"
+MW_PAGE = f"{{{MW_NS}}}page"
+MW_TITLE = f"{{{MW_NS}}}title"
+MW_TEXT = f"{{{MW_NS}}}text"
 LINE_WIDTH = 74  # usable text columns (leave 2 for left margin)
 OUTPUT_FILE = "src/wiki_data.h"
+CACHE_DIR = ".wiki_cache"  # exported wikitext, keyed by page revision ID
+PARSE_CACHE_DIR = os.path.join(CACHE_DIR, "plain")  # wiki_to_plain output by source hash / wikitext hash
+EXPORT_BATCH = 20   # pages per Special:Export request
+FETCH_WORKERS = 10  # concurrent API / Special:Export requests
+FETCH_RATE = 4.0    # max requests per second to the wiki, across all workers
+PARSE_WORKERS = None  # processes for wikitext conversion (None = one per CPU)
 
 # Preferred TOC order (from wiki sidebar navigation).
 # Pages not listed here get appended alphabetically at the end.
@@ -59,6 +85,147 @@ LINE_H3 = 2
 LINE_H4 = 3
 LINE_BLANK = 0  # blank lines use LINE_NORMAL
 
+# ── Rate Limiting ──────────────────────────────────────────────
+
+_throttle_lock = threading.Lock()
+_next_request_at = 0.0
+
+
+def throttle():
+    """Block until the next request slot is free.
+
+    Slots are handed out FETCH_RATE per second across all threads, so the
+    worker pool never hits the wiki harder than a polite serial crawler.
+    """
+    global _next_request_at
+    with _throttle_lock:
+        now = time.monotonic()
+        slot = max(now, _next_request_at)
+        _next_request_at = slot + 1.0 / FETCH_RATE
+    time.sleep(slot - now)
+
+
+# ── HTTP ───────────────────────────────────────────────────────
+
+# Keep-alive connections, one per (scheme, host) per thread, so API and
+# export requests skip the TCP + TLS handshake after the first one. main()
+# runs every fetch stage on one thread pool, so a connection is reused from
+# the redirect queries through to the last export.
+_http_local = threading.local()
+_http_conns = []  # every pooled connection, for close_http_connections()
+_http_conns_lock = threading.Lock()
+HTTP_REDIRECTS = {301, 302, 303, 307, 308}
+
+
+def http_connection(scheme, host):
+    """Return this thread's pooled connection to scheme://host.
+
+    Honours the HTTP(S)_PROXY / NO_PROXY environment like urllib does:
+    HTTPS is tunnelled through the proxy with CONNECT, plain HTTP is sent
+    to it in absolute form. Returns (connection, proxy_headers), where
+    proxy_headers is None unless requests must use the absolute form.
+    """
+    conns = getattr(_http_local, "conns", None)
+    if conns is None:
+        conns = _http_local.conns = {}
+    if (scheme, host) in conns:
+        return conns[(scheme, host)]
+
+    conn_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+    proxy = urllib.request.getproxies().get(scheme)
+    hostname = urllib.parse.urlsplit(f"//{host}").hostname
+    proxy_headers = None
+    if proxy and not urllib.request.proxy_bypass(hostname):
+        if "://" not in proxy:
+            proxy = f"http://{proxy}"
+        proxy_parts = urllib.parse.urlsplit(proxy)
+        auth_headers = {}
+        if proxy_parts.username:
+            credentials = f"{urllib.parse.unquote(proxy_parts.username)}:" \
+                          f"{urllib.parse.unquote(proxy_parts.password or '')}"
+            token = base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+            auth_headers["Proxy-Authorization"] = f"Basic {token}"
+        conn = conn_class(proxy_parts.hostname, proxy_parts.port, timeout=30)
+        if scheme == "https":
+            conn.set_tunnel(host, headers=auth_headers)
+        else:
+            proxy_headers = auth_headers
+    else:
+        conn = conn_class(host, timeout=30)
+
+    conns[(scheme, host)] = (conn, proxy_headers)
+    with _http_conns_lock:
+        _http_conns.append(conn)
+    return conn, proxy_headers
+
+
+def close_http_connections():
+    """Close every pooled connection once the fetch stages are done.
+
+    A thread that makes another request afterwards just reconnects.
+    """
+    with _http_conns_lock:
+        for conn in _http_conns:
+            conn.close()
+        _http_conns.clear()
+
+
+def http_request(url, headers=None, data=None):
+    """GET `url` (or POST form-encoded `data`) over a pooled connection.
+
+    Follows redirects. If a kept-alive connection turns out to have been
+    closed by the server, the request is resent once on a fresh one; any
+    other failure (timeouts included) is raised straight away. Returns
+    (status, headers, body); raises urllib.error.HTTPError for 4xx/5xx
+    responses.
+    """
+    req_headers = {"User-Agent": "EmuPages/1.0"}
+    req_headers.update(headers or {})
+    for _hop in range(5):
+        parts = urllib.parse.urlsplit(url)
+        method = "GET" if data is None else "POST"
+        if data is not None:
+            req_headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        for attempt in range(2):
+            conn, proxy_headers = http_connection(parts.scheme, parts.netloc)
+            if proxy_headers is None:
+                target = parts.path or "/"
+                if parts.query:
+                    target += "?" + parts.query
+                send_headers = req_headers
+            else:
+                target = url
+                send_headers = {**req_headers, **proxy_headers}
+            reused = conn.sock is not None
+            try:
+                conn.request(method, target, body=data, headers=send_headers)
+                resp = conn.getresponse()
+                body = resp.read()
+                break
+            except (ConnectionResetError, BrokenPipeError):
+                # The server dropped an idle keep-alive connection; closing
+                # makes the next request reconnect
+                conn.close()
+                if attempt or not reused:
+                    raise
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                raise
+
+        location = resp.getheader("Location")
+        if resp.status in HTTP_REDIRECTS and location:
+            url = urllib.parse.urljoin(url, location)
+            if resp.status == 303:
+                data = None
+            continue
+        if resp.status >= 400:
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
+        return resp.status, resp.headers, body
+
+    raise urllib.error.HTTPError(url, resp.status, "Too many redirects", resp.headers, None)
+
+
 # ── API Discovery ─────────────────────────────────────────────
 
 def api_query(params):
@@ -66,9 +233,9 @@ def api_query(params):
     params["format"] = "json"
     query_string = "&".join(f"{k}={urllib.request.quote(str(v))}" for k, v in params.items())
     url = f"{API_URL}?{query_string}"
-    req = urllib.request.Request(url, headers={"User-Agent": "EmuPages/1.0"})
-    with urllib.request.urlopen(req, timeout=30) as resp:
-        return json.loads(resp.read())
+    throttle()
+    _status, _headers, body = http_request(url)
+    return json.loads(body)
 
 
 def discover_all_pages():
@@ -92,22 +259,25 @@ def discover_all_pages():
     return titles
 
 
-def resolve_redirects(titles):
-    """Resolve redirect pages via the API.
+def resolve_redirects(titles, pool):
+    """Resolve redirect pages via the API, querying batches on `pool`.
 
     Returns a dict mapping redirect source title to (target_title, fragment_or_None).
     """
-    redirects = {}
-    # API accepts up to 50 titles per query
+    # API accepts up to 50 titles per query; batches are independent, so
+    # query them concurrently.
     batch_size = 50
-    for i in range(0, len(titles), batch_size):
-        batch = titles[i:i + batch_size]
-        pipe_titles = "|".join(batch)
-        data = api_query({
+    batches = [titles[i:i + batch_size] for i in range(0, len(titles), batch_size)]
+
+    def query_batch(batch):
+        return api_query({
             "action": "query",
-            "titles": pipe_titles,
+            "titles": "|".join(batch),
             "redirects": "1",
         })
+
+    redirects = {}
+    for data in pool.map(query_batch, batches):
         for redir in data.get("query", {}).get("redirects", []):
             source = redir["from"]
             target = redir["to"]
@@ -119,35 +289,144 @@ def resolve_redirects(titles):
 
 # ── Fetch ──────────────────────────────────────────────────────
 
-def fetch_page(title):
-    """Fetch a single page from MediaWiki Special:Export."""
-    url_title = title.replace(" ", "_")
-    url = f"{EXPORT_URL}/{url_title}"
-    print(f"  Fetching: {title} ...", end=" ", flush=True)
+def page_revisions(titles, pool):
+    """Look up the current revision ID of each page via the API, on `pool`.
+
+    Returns a dict mapping title to its latest revision ID.
+    """
+    batch_size = 50
+    batches = [titles[i:i + batch_size] for i in range(0, len(titles), batch_size)]
+
+    def query_batch(batch):
+        return api_query({
+            "action": "query",
+            "titles": "|".join(batch),
+            "prop": "info",
+        })
+
+    revisions = {}
+    for data in pool.map(query_batch, batches):
+        for page in data.get("query", {}).get("pages", {}).values():
+            if "lastrevid" in page:
+                revisions[page["title"]] = page["lastrevid"]
+
+    return revisions
+
+
+def cache_path(title):
+    """Return the export cache file path for a page title."""
+    key = urllib.parse.quote(title.replace(" ", "_"), safe="")
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def load_cached_page(title, revid):
+    """Return (display_title, wikitext) if the cache holds revision `revid`."""
+    try:
+        with open(cache_path(title), encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if revid is None or cached.get("revid") != revid:
+        return None
+    return cached["title"], cached["text"]
+
+
+def store_cached_page(title, revid, display_title, wikitext):
+    """Save a page's exported wikitext under its revision ID for the next build.
+
+    Like the parse cache, this is only an optimisation: a failed write
+    leaves the page to be fetched again next time.
+    """
+    path = cache_path(title)
+    # Write then rename, so an interrupted build never leaves a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
     try:
-        req = urllib.request.Request(url, headers={"User-Agent": "EmuPages/1.0"})
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            xml_data = resp.read()
-    except Exception as e:
-        print(f"FAILED: {e}")
-        return title, ""
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"revid": revid, "title": display_title, "text": wikitext}, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
 
-    root = ET.fromstring(xml_data)
-    ns = {"mw": MW_NS}
 
-    page = root.find(".//mw:page", ns)
-    if page is None:
-        print("FAILED: no <page> element")
-        return title, ""
+def fetch_page_batch(titles):
+    """Fetch several pages with one Special:Export POST.
 
-    page_title = page.find("mw:title", ns)
-    display_title = page_title.text if page_title is not None else title
+    Returns a dict mapping each title the export contained to
+    (display_title, wikitext).
+    """
+    data = urllib.parse.urlencode({
+        "pages": "\n".join(titles),
+        "curonly": "1",
+        "action": "submit",
+    }).encode("ascii")
+    throttle()
+    _status, _headers, xml_data = http_request(EXPORT_URL, data=data)
+
+    # Stream the export, keeping only each page's title and text and clearing
+    # every finished <page> so the document tree never builds up.
+    pages = {}
+    display_title = None
+    wikitext = ""
+    for _event, elem in etree.iterparse(io.BytesIO(xml_data), events=("end",)):
+        if elem.tag == MW_TITLE:
+            display_title = elem.text
+        elif elem.tag == MW_TEXT:
+            wikitext = elem.text or ""
+        elif elem.tag == MW_PAGE:
+            if display_title:
+                pages[display_title] = (display_title, wikitext)
+            display_title = None
+            wikitext = ""
+            elem.clear()
+
+    return pages
+
+
+def fetch_pages(titles, revisions, pool):
+    """Fetch every page in `titles` from Special:Export, on `pool`.
+
+    Pages whose revision ID matches the export cache are read from disk; the
+    rest are exported EXPORT_BATCH at a time. Returns a list of
+    (display_title, wikitext) in the order of `titles`, with "" as the
+    wikitext of any page that failed.
+    """
+    fetched = {}
+    stale = []
+    for title in titles:
+        cached = load_cached_page(title, revisions.get(title))
+        if cached:
+            fetched[title] = cached
+            print(f"  Fetching: {title} ... cached (rev {revisions[title]}, {len(cached[1])} chars)")
+        else:
+            stale.append(title)
 
-    text_elem = page.find(".//mw:revision/mw:text", ns)
-    wikitext = text_elem.text if (text_elem is not None and text_elem.text) else ""
+    def fetch_batch(batch):
+        try:
+            return batch, fetch_page_batch(batch), None
+        except Exception as e:
+            return batch, {}, e
+
+    batches = [stale[i:i + EXPORT_BATCH] for i in range(0, len(stale), EXPORT_BATCH)]
+    # Requests are network-bound, so run them on the thread pool; throttle()
+    # inside fetch_page_batch keeps the aggregate request rate polite.
+    for batch, pages, error in pool.map(fetch_batch, batches):
+        for title in batch:
+            if title not in pages:
+                reason = error or "not in export"
+                print(f"  Fetching: {title} ... FAILED: {reason}")
+                fetched[title] = (title, "")
+                continue
+            display_title, wikitext = pages[title]
+            fetched[title] = (display_title, wikitext)
+            if revisions.get(title) is not None:
+                store_cached_page(title, revisions[title], display_title, wikitext)
+            print(f"  Fetching: {title} ... OK ({len(wikitext)} chars)")
 
-    print(f"OK ({len(wikitext)} chars)")
-    return display_title, wikitext
+    return [fetched[title] for title in titles]
 
 
 def extract_section(wikitext, fragment):
@@ -166,14 +445,14 @@ def extract_section(wikitext, fragment):
 
     for line in lines:
         # Check if this is a heading
-        heading_match = re.match(r"^(={2,})\s*(.+?)\s*\1$", line)
+        heading_match = HEADING_RE.match(line)
         if heading_match:
             level = len(heading_match.group(1))
             heading_text = heading_match.group(2).strip()
             # Strip inline markup from heading for comparison
-            clean_heading = re.sub(r"'{2,3}", "", heading_text)
-            clean_heading = re.sub(r"\[\[[^|\]]*\|([^\]]+)\]\]", r"\1", clean_heading)
-            clean_heading = re.sub(r"\[\[([^\]]+)\]\]", r"\1", clean_heading)
+            clean_heading = BOLD_ITALIC_RE.sub("", heading_text)
+            clean_heading = PIPED_LINK_RE.sub(r"\1", clean_heading)
+            clean_heading = LINK_RE.sub(r"\1", clean_heading)
             clean_heading = clean_heading.strip()
 
             if capturing:
@@ -272,6 +551,89 @@ def generate_landing_page(page_count, build_date):
 
 # ── Wikitext → Plain Text ─────────────────────────────────────
 
+# Patterns are compiled once here; the converters below run them for every
+# line, heading and table cell of every page.
+
+# Page-level cleanup (wiki_to_plain)
+MAGIC_WORD_RE = re.compile(r"__[A-Z]+__")
+HTML_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+FILE_LINK_RE = re.compile(r"\[\[(File|Image):[^\]]*\]\]", re.IGNORECASE)
+CATEGORY_RE = re.compile(r"\[\[Category:[^\]]*\]\]", re.IGNORECASE)
+COLLAPSIBLE_DIV_RE = re.compile(
+    r'<div[^>]*class="mw-collapsible[^"]*"[^>]*data-expandtext="([^"]*)"[^>]*>',
+    re.IGNORECASE,
+)
+DIV_TAG_RE = re.compile(r"</?div[^>]*>", re.IGNORECASE)
+TABLE_RE = re.compile(r"\{\|.*?\|\}", re.DOTALL)
+TABLE_PLACEHOLDER_RE = re.compile(r"^__TABLE_(\d+)__$")
+
+# Line-level structure (wiki_to_plain, extract_section)
+HEADING_RE = re.compile(r"^(={2,})\s*(.+?)\s*\1$")
+H4_RE = re.compile(r"^====\s*(.+?)\s*====$")
+H3_RE = re.compile(r"^===\s*(.+?)\s*===$")
+H2_RE = re.compile(r"^==\s*(.+?)\s*==$")
+BULLET3_RE = re.compile(r"^\*\*\*\s*(.*)")
+BULLET2_RE = re.compile(r"^\*\*\s*(.*)")
+BULLET1_RE = re.compile(r"^\*\s*(.*)")
+NUM2_RE = re.compile(r"^##\*?\s*(.*)")
+NUM1_RE = re.compile(r"^#\s*(.*)")
+DEFINITION_RE = re.compile(r"^;(.+?):\s*(.*)")
+TABLE_CELL_SEP_RE = re.compile(r"\|\|")
+# Links and tags are matched whole so find_cell_attr_separator skips the | in them
+CELL_ATTR_SEP_RE = re.compile(r"\[\[[^\]]*\]\]|</?[a-zA-Z][^>]*>|\|")
+
+# Inline markup (strip_inline_markup, extract_section)
+TEMPLATE_BRACE_RE = re.compile(r"\{\{|\}\}")
+BOLD_ITALIC_RE = re.compile(r"'{2,3}")
+PIPED_LINK_RE = re.compile(r"\[\[[^|\]]*\|([^\]]+)\]\]")
+LINK_RE = re.compile(r"\[\[([^\]]+)\]\]")
+MULTI_SPACE_RE = re.compile(r"  +")
+
+# Every other inline construct, as one alternation so strip_inline_markup can
+# clean a line in a single left-to-right scan. Each alternative is wrapped in
+# a named group; replace_inline_token() dispatches on m.lastgroup.
+INLINE_TOKEN_RE = re.compile(
+    r"(?P<br>(?i:<br\s*/?>))"
+    r"|(?P<tag></?[a-zA-Z][^>]*>)"
+    r"|(?P<bold>'{2,3})"
+    r"|(?P<piped>\[\[(?P<target>[^|\]]*)\|(?P<display>[^\]]+)\]\])"
+    r"|(?P<link>\[\[(?P<page>[^\]]+)\]\])"
+    r"|(?P<stray>\]\])"
+    r"|(?P<ext_named>\[https?://[^\s\]]+ (?P<ext_text>[^\]]+)\])"
+    r"|(?P<ext>\[https?://[^\]]+\])"
+    r"|(?P<url>https?://[^\s<]+)"
+)
+
+
+def find_cell_attr_separator(cell):
+    """Return the index of the `|` ending a cell's attributes, or -1.
+
+    A `|` inside a [[target|text]] link or an HTML tag is not a separator.
+    """
+    for m in CELL_ATTR_SEP_RE.finditer(cell):
+        if m.group() == "|":
+            return m.start()
+    return -1
+
+
+def clean_table_cell(cell, header=False):
+    """Drop a table cell's style attributes and inline markup.
+
+    Header cells treat any `attrs |` prefix as attributes; data cells only
+    when it looks like one (contains `=` or starts with `class`).
+    """
+    sep = find_cell_attr_separator(cell)
+    if sep != -1:
+        if header:
+            cell = cell[sep + 1:]
+        else:
+            # Judge the prefix by its text, not by attributes of tags in it
+            attrs = strip_inline_markup(cell[:sep])
+            if "=" in attrs or attrs.startswith("class"):
+                cell = cell[sep + 1:]
+    return strip_inline_markup(cell)
+
+
 def parse_wiki_table(table_text):
     """Convert a wiki table to readable plain text lines.
 
@@ -311,28 +673,16 @@ def parse_wiki_table(table_text):
         # Header cell
         if line.startswith("!"):
             in_header = True
-            cells = re.split(r"\|\|", line.lstrip("!"))
+            cells = TABLE_CELL_SEP_RE.split(line.lstrip("!"))
             for cell in cells:
-                # Strip wiki links first (they contain | that isn't a style separator)
-                cell = strip_inline_markup(cell)
-                # Strip style attributes on what remains
-                if "|" in cell:
-                    cell = cell.split("|", 1)[-1]
-                current_row.append(cell.strip())
+                current_row.append(clean_table_cell(cell, header=True))
             continue
 
         # Data cell
         if line.startswith("|"):
-            cells = re.split(r"\|\|", line.lstrip("|"))
+            cells = TABLE_CELL_SEP_RE.split(line.lstrip("|"))
             for cell in cells:
-                # Strip wiki links first (they contain | that isn't a style separator)
-                cleaned = strip_inline_markup(cell)
-                # Strip style attributes on what remains
-                if "|" in cleaned:
-                    parts = cleaned.split("|", 1)
-                    if "=" in parts[0] or parts[0].strip().startswith("class"):
-                        cleaned = parts[1]
-                current_row.append(cleaned.strip())
+                current_row.append(clean_table_cell(cell))
             continue
 
     # Flush last row
@@ -372,60 +722,80 @@ def parse_wiki_table(table_text):
     return output
 
 
+def replace_inline_token(m):
+    """re.sub callback for INLINE_TOKEN_RE: readable text for one token."""
+    kind = m.lastgroup
+    if kind == "br":
+        # HTML line breaks to spaces
+        return " / "
+    if kind == "piped":
+        # Link text may itself carry bold or tags
+        display = INLINE_TOKEN_RE.sub(replace_inline_token, m.group("display"))
+        # [[#anchor|Link]] and [[#anchor| *]] are wiki nav / footnote markers
+        if m.group("target").startswith("#"):
+            label = html.unescape(display)
+            if label == "Link" or label.strip() == "*":
+                return ""
+        return display
+    if kind == "link":
+        return INLINE_TOKEN_RE.sub(replace_inline_token, m.group("page"))
+    if kind == "ext_named":
+        return INLINE_TOKEN_RE.sub(replace_inline_token, m.group("ext_text"))
+    # HTML tags, bold/italic quotes, stray ]], bare URLs and unlabelled
+    # external links all vanish
+    return ""
+
+
+def strip_templates(text):
+    """Remove {{...}} templates, however deeply nested, in one pass.
+
+    An unclosed {{ is kept as literal text; templates after it are still
+    removed.
+    """
+    if "{{" not in text:
+        return text
+    # Pair each }} with the nearest open {{; unpaired braces stay as text
+    spans = []
+    opens = []
+    for m in TEMPLATE_BRACE_RE.finditer(text):
+        if m.group() == "{{":
+            opens.append(m.start())
+        elif opens:
+            spans.append((opens.pop(), m.end()))
+
+    # Pairs nest, so dropping each outermost span drops everything inside it
+    spans.sort()
+    out = []
+    kept = 0  # text before this offset has been emitted or dropped
+    for start, end in spans:
+        if start < kept:
+            continue
+        out.append(text[kept:start])
+        kept = end
+    out.append(text[kept:])
+    return "".join(out)
+
+
+@functools.lru_cache(maxsize=8192)
 def strip_inline_markup(text):
-    """Remove inline wikitext markup, keeping readable text."""
-    # Remove templates: {{...}} (may be nested, so do multiple passes)
-    for _ in range(3):
-        text = re.sub(r"\{\{[^{}]*\}\}", "", text)
-
-    # HTML line breaks to spaces
-    text = re.sub(r"<br\s*/?>", " / ", text, flags=re.IGNORECASE)
-
-    # Remove all HTML tags (keep content). Broad pattern to catch center, ref, etc.
-    text = re.sub(r"</?[a-zA-Z][^>]*>", "", text)
-
-    # Bold/italic
-    text = re.sub(r"'{2,3}", "", text)
-
-    # Internal links: [[#anchor|Link]] → "" (strip wiki nav "Link" elements)
-    text = re.sub(r"\[\[#[^|\]]*\|Link\]\]", "", text)
-    # [[#anchor| *]] → "" (strip footnote asterisks)
-    text = re.sub(r"\[\[#[^|\]]*\|\s*\*\s*\]\]", "", text)
-    # [[#anchor|Display]] → Display
-    text = re.sub(r"\[\[#[^|\]]*\|([^\]]+)\]\]", r"\1", text)
-    # [[Page|Display]] → Display
-    text = re.sub(r"\[\[[^|\]]*\|([^\]]+)\]\]", r"\1", text)
-    # [[Page]] → Page
-    text = re.sub(r"\[\[([^\]]+)\]\]", r"\1", text)
-
-    # Clean up stray ]] from partially matched links
-    text = text.replace("]]", "")
-
-    # External links: [url text] → text
-    text = re.sub(r"\[https?://[^\s\]]+ ([^\]]+)\]", r"\1", text)
-    text = re.sub(r"\[https?://[^\]]+\]", "", text)
-    # Bare URLs
-    text = re.sub(r"https?://\S+", "", text)
-
-    # Numeric HTML entities: &#42; → *, &#x2630; → #, etc.
-    def decode_html_entity(m):
-        try:
-            if m.group(1).startswith("x"):
-                return chr(int(m.group(1)[1:], 16))
-            return chr(int(m.group(1)))
-        except (ValueError, OverflowError):
-            return "?"
-    text = re.sub(r"&#(x?[0-9a-fA-F]+);", decode_html_entity, text)
-
-    # Named HTML entities
-    text = text.replace("&amp;", "&")
-    text = text.replace("&lt;", "<")
-    text = text.replace("&gt;", ">")
-    text = text.replace("&quot;", '"')
-    text = text.replace("&nbsp;", " ")
+    """Remove inline wikitext markup, keeping readable text.
+
+    Memoized: headings, table cells and blank lines recur within and across
+    pages, and the result depends only on the input.
+    """
+    # Remove templates: {{...}}
+    text = strip_templates(text)
+
+    # Tags, bold/italic, links and URLs in one pass
+    text = INLINE_TOKEN_RE.sub(replace_inline_token, text)
+
+    # Decode HTML entities, folding anything non-ASCII they produce (&nbsp;,
+    # &mdash;, ...) back to the font's character set
+    if "&" in text:
+        text = normalize_unicode(html.unescape(text))
 
     # Collapse whitespace
-    text = re.sub(r"  +", " ", text)
+    text = MULTI_SPACE_RE.sub(" ", text)
 
     return text.strip()
 
@@ -440,30 +810,24 @@ def wiki_to_plain(wikitext):
     text = normalize_unicode(text)
 
     # Remove magic words
-    text = re.sub(r"__[A-Z]+__", "", text)
+    text = MAGIC_WORD_RE.sub("", text)
 
     # Remove HTML comments
-    text = re.sub(r"<!--.*?-->", "", text, flags=re.DOTALL)
+    text = HTML_COMMENT_RE.sub("", text)
 
     # Remove images/files
-    text = re.sub(r"\[\[(File|Image):[^\]]*\]\]", "", text, flags=re.IGNORECASE)
+    text = FILE_LINK_RE.sub("", text)
 
     # Remove categories
-    text = re.sub(r"\[\[Category:[^\]]*\]\]", "", text, flags=re.IGNORECASE)
+    text = CATEGORY_RE.sub("", text)
 
     # Handle collapsible divs — extract content, mark with a header
-    text = re.sub(
-        r'<div[^>]*class="mw-collapsible[^"]*"[^>]*data-expandtext="([^"]*)"[^>]*>',
-        r"\n=== \1 ===\n",
-        text,
-        flags=re.IGNORECASE,
-    )
+    text = COLLAPSIBLE_DIV_RE.sub(r"\n=== \1 ===\n", text)
     # Remove all remaining div tags (including </div>, <div ...>)
-    text = re.sub(r"</?div[^>]*>", "", text, flags=re.IGNORECASE)
+    text = DIV_TAG_RE.sub("", text)
 
     # Remove templates: {{...}} (do before table extraction)
-    for _ in range(3):
-        text = re.sub(r"\{\{[^{}]*\}\}", "", text)
+    text = strip_templates(text)
 
     # Extract and process tables separately
     # We'll replace tables with a placeholder, process them, then splice back
@@ -472,7 +836,7 @@ def wiki_to_plain(wikitext):
         tables.append(match.group(0))
         return f"\n__TABLE_{len(tables) - 1}__\n"
 
-    text = re.sub(r"\{\|.*?\|\}", table_replacer, text, flags=re.DOTALL)
+    text = TABLE_RE.sub(table_replacer, text)
 
     # Process line by line
     raw_lines = text.split("\n")
@@ -482,7 +846,7 @@ def wiki_to_plain(wikitext):
         line = raw_line.rstrip()
 
         # Table placeholder
-        table_match = re.match(r"^__TABLE_(\d+)__$", line.strip())
+        table_match = TABLE_PLACEHOLDER_RE.match(line.strip())
         if table_match:
             idx = int(table_match.group(1))
             table_lines = parse_wiki_table(tables[idx])
@@ -494,7 +858,7 @@ def wiki_to_plain(wikitext):
             continue
 
         # Headings (must check before inline markup strip)
-        h4 = re.match(r"^====\s*(.+?)\s*====$", line)
+        h4 = H4_RE.match(line)
         if h4:
             lines_out.append(("", LINE_BLANK))
             lines_out.append((strip_inline_markup(h4.group(1)), LINE_H4))
@@ -502,7 +866,7 @@ def wiki_to_plain(wikitext):
             num_counter = 0
             continue
 
-        h3 = re.match(r"^===\s*(.+?)\s*===$", line)
+        h3 = H3_RE.match(line)
         if h3:
             lines_out.append(("", LINE_BLANK))
             lines_out.append((strip_inline_markup(h3.group(1)), LINE_H3))
@@ -510,7 +874,7 @@ def wiki_to_plain(wikitext):
             num_counter = 0
             continue
 
-        h2 = re.match(r"^==\s*(.+?)\s*==$", line)
+        h2 = H2_RE.match(line)
         if h2:
             lines_out.append(("", LINE_BLANK))
             lines_out.append((strip_inline_markup(h2.group(1)), LINE_H2))
@@ -528,32 +892,32 @@ def wiki_to_plain(wikitext):
             continue
 
         # Nested bullets
-        bullet3 = re.match(r"^\*\*\*\s*(.*)", line)
+        bullet3 = BULLET3_RE.match(line)
         if bullet3:
             for wrapped in word_wrap(f"      - {bullet3.group(1)}", LINE_WIDTH):
                 lines_out.append((wrapped, LINE_NORMAL))
             continue
 
-        bullet2 = re.match(r"^\*\*\s*(.*)", line)
+        bullet2 = BULLET2_RE.match(line)
         if bullet2:
             for wrapped in word_wrap(f"    - {bullet2.group(1)}", LINE_WIDTH):
                 lines_out.append((wrapped, LINE_NORMAL))
             continue
 
-        bullet1 = re.match(r"^\*\s*(.*)", line)
+        bullet1 = BULLET1_RE.match(line)
         if bullet1:
             for wrapped in word_wrap(f"  - {bullet1.group(1)}", LINE_WIDTH):
                 lines_out.append((wrapped, LINE_NORMAL))
             continue
 
         # Numbered lists (with nesting)
-        num2 = re.match(r"^##\*?\s*(.*)", line)
+        num2 = NUM2_RE.match(line)
         if num2:
             for wrapped in word_wrap(f"    - {num2.group(1)}", LINE_WIDTH):
                 lines_out.append((wrapped, LINE_NORMAL))
             continue
 
-        num1 = re.match(r"^#\s*(.*)", line)
+        num1 = NUM1_RE.match(line)
         if num1:
             num_counter += 1
             for wrapped in word_wrap(f"  {num_counter}. {num1.group(1)}", LINE_WIDTH):
@@ -561,7 +925,7 @@ def wiki_to_plain(wikitext):
             continue
 
         # Definition lists
-        dl = re.match(r"^;(.+?):\s*(.*)", line)
+        dl = DEFINITION_RE.match(line)
         if dl:
             for wrapped in word_wrap(f"{dl.group(1)}: {dl.group(2)}", LINE_WIDTH):
                 lines_out.append((wrapped, LINE_NORMAL))
@@ -592,6 +956,80 @@ def wiki_to_plain(wikitext):
     return cleaned
 
 
+# Digest of this script, naming the parse cache subdirectory: any edit to
+# the converter (or to LINE_WIDTH) invalidates the cache without a manual bump
+with open(__file__, "rb") as _source:
+    SOURCE_DIGEST = hashlib.blake2b(_source.read(), digest_size=16).digest()
+
+_pruned_parse_cache = None  # the subdirectory prune_parse_cache() last kept
+
+
+def prune_parse_cache(keep):
+    """Delete everything in PARSE_CACHE_DIR except the subdirectory `keep`.
+
+    Entries written by earlier versions of this script can never be hit
+    again. Runs once per process; parallel workers racing to delete the
+    same directory is harmless.
+    """
+    global _pruned_parse_cache
+    if _pruned_parse_cache == keep:
+        return
+    _pruned_parse_cache = keep
+    try:
+        entries = list(os.scandir(PARSE_CACHE_DIR))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name == keep:
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path, ignore_errors=True)
+        else:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def cached_wiki_to_plain(wikitext):
+    """wiki_to_plain, memoized on disk by a hash of the wikitext.
+
+    Pages that haven't changed since the last build skip conversion
+    entirely. Entries live in a subdirectory named after SOURCE_DIGEST,
+    and the first write in a process deletes any other subdirectory. The
+    cache is only an optimisation: if an entry can't be written, the
+    freshly converted lines are returned anyway.
+    """
+    if not wikitext:
+        return wiki_to_plain(wikitext)
+    source_dir = SOURCE_DIGEST.hex()
+    cache_dir = os.path.join(PARSE_CACHE_DIR, source_dir)
+    digest = hashlib.blake2b(wikitext.encode("utf-8"), digest_size=16)
+    path = os.path.join(cache_dir, f"{digest.hexdigest()}.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return [tuple(line) for line in json.load(f)]
+    except (OSError, ValueError, TypeError):
+        pass
+
+    plain_lines = wiki_to_plain(wikitext)
+    prune_parse_cache(source_dir)
+    # Write then rename, so parallel workers never see a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(plain_lines, f)
+        # On Windows this fails while another worker has `path` open
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    return plain_lines
+
+
 def word_wrap(text, width):
     """Word-wrap a single line of text to the given width.
 
@@ -629,169 +1067,234 @@ def word_wrap(text, width):
 
 # ── C Header Generation ───────────────────────────────────────
 
+# Fixed ASCII stand-ins for characters the 8x8 font can't draw
+UNICODE_REPLACEMENTS = {
+    # Smart quotes and apostrophes
+    "\u2018": "'",   # '
+    "\u2019": "'",   # '
+    "\u201C": '"',   # "
+    "\u201D": '"',   # "
+    "\u00B4": "'",   # ´
+    "\u0060": "'",   # `
+    # Dashes
+    "\u2013": "-",   # en dash
+    "\u2014": "--",  # em dash
+    "\u2012": "-",   # figure dash
+    # Spaces
+    "\u00A0": " ",   # non-breaking space
+    "\u2003": " ",   # em space
+    "\u2002": " ",   # en space
+    # Arrows
+    "\u2190": "<-",  # ←
+    "\u2192": "->",  # →
+    "\u2191": "^",   # ↑
+    "\u2193": "v",   # ↓
+    "\u21D2": "=>",  # ⇒
+    # PlayStation symbols
+    "\u2716": "X",      # ✖ (Cross)
+    "\u2B24": "O",      # ⬤ (Circle)
+    "\u25FC": "[]",     # ◼ (Square)
+    "\u25B2": "/\\",    # ▲ (Triangle)
+    # Other common symbols
+    "\u2022": "-",   # • bullet
+    "\u2026": "...", # … ellipsis
+    "\u00D7": "x",   # × multiplication
+    "\u2714": "[x]", # ✔ check mark
+    "\u2718": "[ ]", # ✘ cross mark
+    "\u2605": "*",   # ★
+    "\u2606": "*",   # ☆
+    "\u00A9": "(c)", # ©
+    "\u00AE": "(R)", # ®
+    "\u2122": "(TM)", # ™
+    "\u00BD": "1/2", # ½
+    "\u00BC": "1/4", # ¼
+    "\u00BE": "3/4", # ¾
+    "\u2630": "#",   # ☰ hamburger menu
+}
+UNICODE_TABLE = str.maketrans(UNICODE_REPLACEMENTS)
+
+# Name-based fallbacks, keyed by codepoint and filled in lazily by
+# normalize_unicode() so each character is classified once per run.
+# Used directly as a str.translate() table.
+NON_ASCII_TABLE = {}
+
+
+def fold_non_ascii(ch):
+    """Pick an ASCII stand-in for a non-ASCII character from its Unicode name.
+
+    Returns "" for characters that should be dropped (emojis, decorative icons).
+    """
+    name = unicodedata.name(ch, "").lower()
+    if not name:
+        return ""  # silently drop
+    elif "arrow" in name:
+        return ">"
+    elif "bullet" in name or "dot" in name:
+        return "-"
+    elif "star" in name:
+        return "*"
+    elif "check" in name or "ballot" in name:
+        return "x"
+    elif "cross" in name:
+        return "X"
+    elif "dash" in name or "hyphen" in name:
+        return "-"
+    elif "space" in name:
+        return " "
+    elif "quotation" in name or "apostrophe" in name:
+        return "'"
+    # Silently drop all other non-ASCII (emojis, decorative icons)
+    return ""
+
+
 def normalize_unicode(text):
     """Replace common Unicode characters with ASCII equivalents.
 
     Handles emojis, smart quotes, special symbols, etc. so the
     8x8 bitmap font (ASCII 32-127 only) can display them.
     """
-    replacements = {
-        # Smart quotes and apostrophes
-        "\u2018": "'",   # '
-        "\u2019": "'",   # '
-        "\u201C": '"',   # "
-        "\u201D": '"',   # "
-        "\u00B4": "'",   # ´
-        "\u0060": "'",   # `
-        # Dashes
-        "\u2013": "-",   # en dash
-        "\u2014": "--",  # em dash
-        "\u2012": "-",   # figure dash
-        # Spaces
-        "\u00A0": " ",   # non-breaking space
-        "\u2003": " ",   # em space
-        "\u2002": " ",   # en space
-        # Arrows
-        "\u2190": "<-",  # ←
-        "\u2192": "->",  # →
-        "\u2191": "^",   # ↑
-        "\u2193": "v",   # ↓
-        "\u21D2": "=>",  # ⇒
-        # PlayStation symbols
-        "\u2716": "X",      # ✖ (Cross)
-        "\u2B24": "O",      # ⬤ (Circle)
-        "\u25FC": "[]",     # ◼ (Square)
-        "\u25B2": "/\\",    # ▲ (Triangle)
-        # Other common symbols
-        "\u2022": "-",   # • bullet
-        "\u2026": "...", # … ellipsis
-        "\u00D7": "x",   # × multiplication
-        "\u2714": "[x]", # ✔ check mark
-        "\u2718": "[ ]", # ✘ cross mark
-        "\u2605": "*",   # ★
-        "\u2606": "*",   # ☆
-        "\u00A9": "(c)", # ©
-        "\u00AE": "(R)", # ®
-        "\u2122": "(TM)", # ™
-        "\u00BD": "1/2", # ½
-        "\u00BC": "1/4", # ¼
-        "\u00BE": "3/4", # ¾
-        "\u2630": "#",   # ☰ hamburger menu
-    }
-
-    # Emoji ranges to strip (replace with nothing or a symbol)
-    # Common emoji codepoint ranges
-    import unicodedata
-
-    for old, new in replacements.items():
-        text = text.replace(old, new)
-
-    # Strip remaining non-ASCII: replace emojis/symbols with nothing
-    result = []
-    for ch in text:
-        if ord(ch) < 128:
-            result.append(ch)
-        else:
-            # Try to get a useful name-based replacement
-            try:
-                name = unicodedata.name(ch, "").lower()
-            except ValueError:
-                name = ""
-
-            if not name:
-                continue  # silently drop
-            elif "arrow" in name:
-                result.append(">")
-            elif "bullet" in name or "dot" in name:
-                result.append("-")
-            elif "star" in name:
-                result.append("*")
-            elif "check" in name or "ballot" in name:
-                result.append("x")
-            elif "cross" in name:
-                result.append("X")
-            elif "dash" in name or "hyphen" in name:
-                result.append("-")
-            elif "space" in name:
-                result.append(" ")
-            elif "quotation" in name or "apostrophe" in name:
-                result.append("'")
-            # Silently drop all other non-ASCII (emojis, decorative icons)
-
-    return "".join(result)
+    text = text.translate(UNICODE_TABLE)
+    if text.isascii():
+        return text
+
+    # Strip remaining non-ASCII: classify each new codepoint once, then
+    # replace them all in a single translate pass
+    for ch in set(text):
+        cp = ord(ch)
+        if cp >= 128 and cp not in NON_ASCII_TABLE:
+            NON_ASCII_TABLE[cp] = fold_non_ascii(ch)
+    return text.translate(NON_ASCII_TABLE)
+
+
+# Control characters with no C escape here, dropped by escape_c_string
+C_CONTROL_RE = re.compile(r"[\x00-\x08\x0b-\x1f\x7f]")
+# One escape sequence as written by escape_c_string (\\, \", \t, \n)
+C_ESCAPE_SEQ_RE = re.compile(r"\\.")
 
 
 def escape_c_string(s):
     """Escape a string for use in a C string literal."""
     s = normalize_unicode(s)
+    # Any remaining non-ASCII (shouldn't happen after normalize)
+    if not s.isascii():
+        s = s.encode("ascii", "ignore").decode("ascii")
+    s = C_CONTROL_RE.sub("", s)
     s = s.replace("\\", "\\\\")
     s = s.replace('"', '\\"')
     s = s.replace("\t", "\\t")
-    # Any remaining non-ASCII (shouldn't happen after normalize)
-    result = []
-    for ch in s:
-        if 32 <= ord(ch) <= 126:
-            result.append(ch)
-        elif ch == "\n":
-            result.append("\\n")
-        else:
-            pass  # silently drop
-    return "".join(result)
+    s = s.replace("\n", "\\n")
+    return s
+
+
+def c_string_length(escaped):
+    """Length in bytes of an escape_c_string() result once compiled."""
+    return len(escaped) - len(C_ESCAPE_SEQ_RE.findall(escaped))
 
 
-def generate_header(pages_data):
-    """Generate the wiki_data.h C header content."""
+def write_header(pages_data, fp):
+    """Write the wiki_data.h C header to the open text file `fp`.
+
+    All text lives in one NUL-separated wiki_text[] blob, each distinct
+    string once. Lines are uint32_t offsets into it plus 2-bit types packed
+    four to a byte, and pages are ranges of lines. Inline accessors hide the
+    packing from the C code.
+    """
     build_date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
     page_count = len(pages_data)
 
-    out = []
-    out.append("/* AUTO-GENERATED by tools/fetch_wiki.py -- DO NOT EDIT */")
-    out.append(f"/* Built: {build_date} */")
-    out.append("#ifndef WIKI_DATA_H")
-    out.append("#define WIKI_DATA_H")
-    out.append("")
-    out.append(f"#define WIKI_PAGE_COUNT {page_count}")
-    out.append(f'#define WIKI_BUILD_DATE "{build_date}"')
-    out.append("")
-    out.append("/* Line types */")
-    out.append(f"#define LINE_NORMAL {LINE_NORMAL}")
-    out.append(f"#define LINE_H2     {LINE_H2}")
-    out.append(f"#define LINE_H3     {LINE_H3}")
-    out.append(f"#define LINE_H4     {LINE_H4}")
-    out.append("")
-    out.append("typedef struct {")
-    out.append("    const char *text;")
-    out.append("    int type;")
-    out.append("} wiki_line_t;")
-    out.append("")
-    out.append("typedef struct {")
-    out.append("    const char *title;")
-    out.append("    const wiki_line_t *lines;")
-    out.append("    int line_count;")
-    out.append("} wiki_page_t;")
-    out.append("")
-
-    # Generate per-page line arrays
-    for i, (title, page_lines) in enumerate(pages_data):
-        out.append(f"/* Page {i}: {title} */")
-        out.append(f"static const wiki_line_t page_{i}_lines[] = {{")
+    # Lay out the blob: blank lines, headings and table labels repeat across
+    # pages, so each distinct string gets one offset that every use shares.
+    offsets = {}
+    blob_size = 0
+
+    def intern(text):
+        nonlocal blob_size
+        escaped = escape_c_string(text)
+        if escaped not in offsets:
+            offsets[escaped] = blob_size
+            blob_size += c_string_length(escaped) + 1
+        return offsets[escaped]
+
+    pages = []  # (title offset, first line, line count)
+    line_offsets = []
+    line_types = []
+    for title, page_lines in pages_data:
+        pages.append((intern(title), len(line_offsets), len(page_lines)))
         for text_val, line_type in page_lines:
-            escaped = escape_c_string(text_val)
-            out.append(f'    {{"{escaped}", {line_type}}},')
-        out.append("};")
-        out.append("")
-
-    # Generate master array
-    out.append("static const wiki_page_t wiki_pages[WIKI_PAGE_COUNT] = {")
-    for i, (title, page_lines) in enumerate(pages_data):
-        escaped_title = escape_c_string(title)
-        count = len(page_lines)
-        out.append(f'    {{"{escaped_title}", page_{i}_lines, {count}}},')
-    out.append("};")
-    out.append("")
-    out.append("#endif /* WIKI_DATA_H */")
-
-    return "\n".join(out) + "\n"
+            line_offsets.append(intern(text_val))
+            line_types.append(line_type)
+
+    fp.write("/* AUTO-GENERATED by tools/fetch_wiki.py -- DO NOT EDIT */\n")
+    fp.write(f"/* Built: {build_date} */\n")
+    fp.write("#ifndef WIKI_DATA_H\n")
+    fp.write("#define WIKI_DATA_H\n")
+    fp.write("\n")
+    fp.write("#include <stdint.h>\n")
+    fp.write("\n")
+    fp.write(f"#define WIKI_PAGE_COUNT {page_count}\n")
+    fp.write(f'#define WIKI_BUILD_DATE "{build_date}"\n')
+    fp.write("\n")
+    fp.write("/* Line types */\n")
+    fp.write(f"#define LINE_NORMAL {LINE_NORMAL}\n")
+    fp.write(f"#define LINE_H2     {LINE_H2}\n")
+    fp.write(f"#define LINE_H3     {LINE_H3}\n")
+    fp.write(f"#define LINE_H4     {LINE_H4}\n")
+    fp.write("\n")
+    fp.write("typedef struct {\n")
+    fp.write("    uint32_t title;       /* offset into wiki_text */\n")
+    fp.write("    uint32_t first_line;  /* index into wiki_line_offsets */\n")
+    fp.write("    int line_count;\n")
+    fp.write("} wiki_page_t;\n")
+    fp.write("\n")
+
+    # One literal per string; adjacent literals concatenate into the blob
+    fp.write("/* All titles and lines, NUL-separated */\n")
+    fp.write("static const char wiki_text[] =\n")
+    fp.writelines(f'    "{escaped}\\0"\n' for escaped in offsets)
+    fp.write("    ;\n")
+    fp.write("\n")
+
+    fp.write("/* Offset of each line's text in wiki_text */\n")
+    fp.write(f"static const uint32_t wiki_line_offsets[{max(len(line_offsets), 1)}] = {{\n")
+    for i in range(0, len(line_offsets), 8):
+        fp.write("    " + " ".join(f"{off}," for off in line_offsets[i:i + 8]) + "\n")
+    fp.write("};\n")
+    fp.write("\n")
+
+    fp.write("/* Line types, 2 bits each, four lines per byte (low bits first) */\n")
+    packed = [
+        sum(line_type << (2 * j) for j, line_type in enumerate(line_types[i:i + 4]))
+        for i in range(0, len(line_types), 4)
+    ]
+    fp.write(f"static const uint8_t wiki_line_types[{max(len(packed), 1)}] = {{\n")
+    for i in range(0, len(packed), 16):
+        fp.write("    " + " ".join(f"0x{byte:02x}," for byte in packed[i:i + 16]) + "\n")
+    fp.write("};\n")
+    fp.write("\n")
+
+    fp.write("static const wiki_page_t wiki_pages[WIKI_PAGE_COUNT] = {\n")
+    for i, (title_off, first_line, count) in enumerate(pages):
+        fp.write(f"    {{{title_off}, {first_line}, {count}}},  /* Page {i} */\n")
+    fp.write("};\n")
+    fp.write("\n")
+
+    fp.write("static inline const char *wiki_page_title(int page)\n")
+    fp.write("{\n")
+    fp.write("    return &wiki_text[wiki_pages[page].title];\n")
+    fp.write("}\n")
+    fp.write("\n")
+    fp.write("static inline const char *wiki_line_text(int page, int line)\n")
+    fp.write("{\n")
+    fp.write("    return &wiki_text[wiki_line_offsets[wiki_pages[page].first_line + line]];\n")
+    fp.write("}\n")
+    fp.write("\n")
+    fp.write("static inline int wiki_line_type(int page, int line)\n")
+    fp.write("{\n")
+    fp.write("    uint32_t n = wiki_pages[page].first_line + line;\n")
+    fp.write("    return (wiki_line_types[n >> 2] >> ((n & 3) * 2)) & 3;\n")
+    fp.write("}\n")
+    fp.write("\n")
+    fp.write("#endif /* WIKI_DATA_H */\n")
 
 
 # ── Main ───────────────────────────────────────────────────────
@@ -809,76 +1312,92 @@ def main():
     print(f"  Found {len(all_titles)} pages")
     print()
 
-    # Step 2: Resolve redirects
-    print("Resolving redirects ...")
-    redirects = resolve_redirects(all_titles)
-    redirect_titles = set(redirects.keys())
-    content_titles = [t for t in all_titles if t not in redirect_titles and t not in EXCLUDE_PAGES]
-
-    if EXCLUDE_PAGES & set(all_titles):
-        print(f"  Excluding: {', '.join(EXCLUDE_PAGES & set(all_titles))}")
-
-    # Classify redirects
-    section_redirects = {}  # has fragment — include with extracted section
-    alias_redirects = {}    # no fragment — skip (target already in content)
-    for source, (target, fragment) in redirects.items():
-        if fragment:
-            section_redirects[source] = (target, fragment)
-            print(f"  {source} -> {target}#{fragment} (section redirect, will extract)")
-        else:
-            alias_redirects[source] = target
-            print(f"  {source} -> {target} (alias, skipping)")
+    # Network requests for steps 2-4 share one thread pool, so each thread's
+    # keep-alive connection is reused across stages. Its threads are gone
+    # before the parse processes below fork.
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as fetch_pool:
+        # Step 2: Resolve redirects
+        print("Resolving redirects ...")
+        redirects = resolve_redirects(all_titles, fetch_pool)
+        redirect_titles = set(redirects.keys())
+        content_titles = [t for t in all_titles if t not in redirect_titles and t not in EXCLUDE_PAGES]
+
+        if EXCLUDE_PAGES & set(all_titles):
+            print(f"  Excluding: {', '.join(EXCLUDE_PAGES & set(all_titles))}")
+
+        # Classify redirects
+        section_redirects = {}  # has fragment — include with extracted section
+        alias_redirects = {}    # no fragment — skip (target already in content)
+        for source, (target, fragment) in redirects.items():
+            if fragment:
+                section_redirects[source] = (target, fragment)
+                print(f"  {source} -> {target}#{fragment} (section redirect, will extract)")
+            else:
+                alias_redirects[source] = target
+                print(f"  {source} -> {target} (alias, skipping)")
+
+        print(f"  {len(content_titles)} content pages, "
+              f"{len(section_redirects)} section redirects, "
+              f"{len(alias_redirects)} aliases skipped")
+        print()
 
-    print(f"  {len(content_titles)} content pages, "
-          f"{len(section_redirects)} section redirects, "
-          f"{len(alias_redirects)} aliases skipped")
-    print()
+        # Step 3: Determine TOC order
+        ordered_titles = order_pages(content_titles, section_redirects)
 
-    # Step 3: Determine TOC order
-    ordered_titles = order_pages(content_titles, section_redirects)
+        # Step 4: Fetch all content pages
+        print(f"Fetching {len(content_titles)} content pages from {WIKI_BASE}")
+        print()
 
-    # Step 4: Fetch all content pages
-    print(f"Fetching {len(content_titles)} content pages from {WIKI_BASE}")
-    print()
+        revisions = page_revisions(content_titles, fetch_pool)
+        fetched = fetch_pages(content_titles, revisions, fetch_pool)
+    close_http_connections()
 
     # Cache wikitext by title (needed for section extraction)
     wikitext_cache = {}
     pages_data = {}
 
-    for title in content_titles:
-        display_title, wikitext = fetch_page(title)
-        wikitext_cache[title] = wikitext
-
-        if not wikitext:
-            print(f"  WARNING: Empty content for {title}")
-            pages_data[title] = (display_title, [("(Page content unavailable)", LINE_NORMAL)])
-        else:
-            plain_lines = wiki_to_plain(wikitext)
-            pages_data[title] = (display_title, plain_lines)
-            print(f"    -> {len(plain_lines)} lines")
-
-        time.sleep(0.5)
-
-    # Step 5: Process section redirects
-    if section_redirects:
+    # wiki_to_plain is CPU-bound and pages are independent, so convert them
+    # on a process pool (threads would just contend for the GIL).
+    with ProcessPoolExecutor(max_workers=PARSE_WORKERS) as parse_pool:
         print()
-        print("Extracting sections for redirect pages ...")
-        for redir_title, (target, fragment) in section_redirects.items():
-            target_wikitext = wikitext_cache.get(target, "")
-            if not target_wikitext:
-                print(f"  WARNING: No wikitext for target {target}, skipping {redir_title}")
-                pages_data[redir_title] = (redir_title, [("(Section content unavailable)", LINE_NORMAL)])
-                continue
-
-            section_text = extract_section(target_wikitext, fragment)
-            if not section_text:
-                print(f"  WARNING: Section '{fragment}' not found in {target}")
-                pages_data[redir_title] = (redir_title, [("(Section not found)", LINE_NORMAL)])
-                continue
-
-            plain_lines = wiki_to_plain(section_text)
-            pages_data[redir_title] = (redir_title, plain_lines)
-            print(f"  {redir_title} <- {target}#{fragment} -> {len(plain_lines)} lines")
+        print("Converting pages ...")
+        wikitexts = [wikitext for _display_title, wikitext in fetched]
+        converted = parse_pool.map(cached_wiki_to_plain, wikitexts, chunksize=4)
+        for title, (display_title, wikitext), plain_lines in zip(content_titles, fetched, converted):
+            wikitext_cache[title] = wikitext
+
+            if not wikitext:
+                print(f"  WARNING: Empty content for {title}")
+                pages_data[title] = (display_title, [("(Page content unavailable)", LINE_NORMAL)])
+            else:
+                pages_data[title] = (display_title, plain_lines)
+                print(f"  {title} -> {len(plain_lines)} lines")
+
+        # Step 5: Process section redirects
+        if section_redirects:
+            print()
+            print("Extracting sections for redirect pages ...")
+            sections = []
+            for redir_title, (target, fragment) in section_redirects.items():
+                target_wikitext = wikitext_cache.get(target, "")
+                if not target_wikitext:
+                    print(f"  WARNING: No wikitext for target {target}, skipping {redir_title}")
+                    pages_data[redir_title] = (redir_title, [("(Section content unavailable)", LINE_NORMAL)])
+                    continue
+
+                section_text = extract_section(target_wikitext, fragment)
+                if not section_text:
+                    print(f"  WARNING: Section '{fragment}' not found in {target}")
+                    pages_data[redir_title] = (redir_title, [("(Section not found)", LINE_NORMAL)])
+                    continue
+
+                sections.append((redir_title, target, fragment, section_text))
+
+            section_texts = [section_text for *_, section_text in sections]
+            converted = parse_pool.map(cached_wiki_to_plain, section_texts)
+            for (redir_title, target, fragment, _section_text), plain_lines in zip(sections, converted):
+                pages_data[redir_title] = (redir_title, plain_lines)
+                print(f"  {redir_title} <- {target}#{fragment} -> {len(plain_lines)} lines")
 
     # Step 6: Build final ordered list with landing page
     content_page_count = len(content_titles) + len(section_redirects)
@@ -893,9 +1412,8 @@ def main():
     print()
     print(f"Generating {OUTPUT_FILE} ...")
 
-    header_content = generate_header(final_pages)
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        f.write(header_content)
+    with open(OUTPUT_FILE, "w", encoding="utf-8", buffering=1 << 20) as f:
+        write_header(final_pages, f)
 
     total_lines = sum(len(lines) for _, lines in final_pages)
     print(f"Done! {len(final_pages)} pages (1 landing + {content_page_count} wiki), "